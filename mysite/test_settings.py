@@ -0,0 +1,16 @@
+"""
+Django settings for running the mysite tests.
+
+Use with ``python manage.py test --settings=mysite.test_settings``.
+The test database is an in-memory SQLite database, so no database
+server is needed and the schema is built without disk I/O.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
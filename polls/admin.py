@@ -1,5 +1,13 @@
 from django.contrib import admin
 
-from .models import Question
+from .models import Question, Vote
 
 admin.site.register(Question)
+
+
+@admin.register(Vote)
+class VoteAdmin(admin.ModelAdmin):
+    list_display = ('user', 'choice', 'question')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
@@ -5,6 +5,38 @@ from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+class QuestionQuerySet(models.QuerySet):
+    """A QuerySet of questions which filters by the voting period in SQL."""
+
+    def published(self, now=None):
+        """Return the questions whose pub_date is on or before now."""
+        now = now or timezone.now()
+        return self.filter(pub_date__lte=now)
+
+    def votable(self, now=None):
+        """Return the published questions that are still open for voting."""
+        now = now or timezone.now()
+        return self.published(now).filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gte=now))
+
+    def with_voting_status(self, now=None):
+        """
+        Annotate the questions with whether voting is open at now.
+
+        The flag is stored in `can_vote_now`. It only checks the end_date,
+        so it is meant for questions which are already published.
+        """
+        now = now or timezone.now()
+        return self.annotate(can_vote_now=models.Case(
+            models.When(models.Q(end_date__isnull=True)
+                        | models.Q(end_date__gte=now),
+                        then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField()))
+
 
 class Question(models.Model):
     """
@@ -17,31 +49,42 @@ class Question(models.Model):
     pub_date = models.DateTimeField(verbose_name='date published',
                                     default=timezone.now)
     end_date = models.DateTimeField(verbose_name='ended date',
-                                    blank=True, null=True, default=None)
+                                    blank=True, null=True)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date']),
+            models.Index(fields=['end_date']),
+        ]
 
     def __str__(self):
         """Return question text."""
         return self.question_text
 
-    def was_published_recently(self):
+    def was_published_recently(self, now=None):
         """
         Check whether the question is published within a day.
 
+        :param now: the current time, defaults to timezone.now()
         :return: bool
         """
-        now = timezone.now()
-        return now - datetime.timedelta(days=1) <= self.pub_date <= now
+        now = now or timezone.now()
+        return now - _ONE_DAY <= self.pub_date <= now
 
-    def is_published(self):
+    def is_published(self, now=None):
         """
         Check if the current time is on or after question’s pub_date.
 
+        :param now: the current time, defaults to timezone.now()
         :return: bool
         """
-        now = timezone.now()
+        now = now or timezone.now()
         return self.pub_date <= now
 
-    def can_vote(self):
+    def can_vote(self, now=None):
         """
         Check whether the voting is allowed for this specific question.
 
@@ -49,21 +92,13 @@ class Question(models.Model):
         is between the pub_date and end_date.
         If end_date is None, then can vote anytime after published.
 
+        :param now: the current time, defaults to timezone.now()
         :return: bool
         """
-        now = timezone.now()
+        now = now or timezone.now()
         if self.end_date:
-            return self.is_published() and now <= self.end_date
-        return self.is_published()
-
-    def cur_user_voted(self, user):
-        return Vote.objects.filter(user=user.id, choice__question=self).exists()
-
-    def cur_user_choice(self, user):
-        try:
-            return Vote.objects.filter(user=user.id, choice__question=self)[0].choice
-        except IndexError:
-            return None
+            return self.is_published(now) and now <= self.end_date
+        return self.is_published(now)
 
 
 class Choice(models.Model):
@@ -76,22 +111,61 @@ class Choice(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
 
-    @property
-    def votes(self) -> int:
-        """Return the total number of votes for a choice."""
-        return self.vote_set.count()
-
     def __str__(self):
         """Return choice text."""
         return self.choice_text
 
 
+class VoteQuerySet(models.QuerySet):
+    """A QuerySet of votes."""
+
+    def with_related(self):
+        """Return the votes with their user, choice and question joined."""
+        return self.select_related('user', 'choice', 'question')
+
+
 class Vote(models.Model):
-    """A vote by a user for a choice in a poll."""
+    """
+    A vote by a user for a choice in a poll.
+
+    The question of the choice is stored on the vote as well, so a user's
+    vote for a question can be looked up without joining the choice.
+    It is taken from the choice when the vote is saved.
+    """
 
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE,
+                                 editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = VoteQuerySet.as_manager()
+
+    class Meta:
+        # One vote per user for each question. The unique constraint is
+        # backed by an index on (user, question), which also serves the
+        # per-user vote lookups.
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'],
+                                    name='uniq_user_question_vote'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Save the vote with the question of its choice.
+
+        The question is taken from the choice when the choice object is
+        already loaded, as in the admin form, or when no question is set.
+        A vote saved by ids with its question doesn't load the choice.
+        """
+        choice_field = self._meta.get_field('choice')
+        if self.question_id is None or choice_field.is_cached(self):
+            self.question_id = self.choice.question_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
-        """Return string contains user and choice selected by the user."""
-        return f"{self.user} -> {self.choice}"
+        """
+        Return string contains ids of the user and the selected choice.
+
+        Only the foreign key ids are used so no related object is loaded.
+        """
+        return f"user={self.user_id} -> choice={self.choice_id}"
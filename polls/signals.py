@@ -0,0 +1,50 @@
+"""Signal receivers of the KU Polls app."""
+from django.contrib.auth.signals import (user_logged_in,
+                                         user_logged_out, user_login_failed)
+from django.dispatch import receiver
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_client_ip(request):
+    """
+    Get the visitor’s IP address using request headers.
+
+    The address is cached on the request, so it's only parsed once.
+    """
+    try:
+        return request._client_ip
+    except AttributeError:
+        pass
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.partition(',')[0].strip()
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    request._client_ip = ip
+    return ip
+
+
+@receiver(user_logged_in)
+def user_logged_in_callback(sender, request, user, **kwargs):
+    """Log a message when user logging in to the app."""
+    ip = get_client_ip(request)
+
+    logger.info('login user: %s via ip: %s', user.get_username(), ip)
+
+
+@receiver(user_logged_out)
+def user_logged_out_callback(sender, request, user, **kwargs):
+    """Log a message when user logging out of the app."""
+    ip = get_client_ip(request)
+
+    logger.info('logout user: %s via ip: %s',
+                user.get_username() if user else None, ip)
+
+
+@receiver(user_login_failed)
+def user_login_failed_callback(sender, credentials, **kwargs):
+    """Log a message when user fail to logging in to the app."""
+    logger.warning('login failed for: %s', credentials)
@@ -0,0 +1,59 @@
+"""Factories of the objects used by the KU Polls unittests."""
+import datetime
+
+from django.db.models import Count
+from django.utils import timezone
+
+from polls.models import Choice, Question, Vote
+
+
+def create_question(question_text, pub_days=0, end_days=None, num_choice=0):
+    """
+    Create question object.
+
+    Create a question with the given `question_text`, published the
+    given number of `pub_days`, and ended the
+    given number of `end_days` offset to now (negative for questions published
+    in the past, positive for questions that have yet to be published).
+    The question contains `num_choice` amount of choices.
+    """
+    pub_time = timezone.now() + datetime.timedelta(days=pub_days)
+    try:
+        end_time = timezone.now() + datetime.timedelta(days=end_days)
+    except TypeError:
+        end_time = None
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=pub_time, end_date=end_time)
+    Choice.objects.bulk_create([Choice(question=question, choice_text=str(i))
+                                for i in range(num_choice)])
+    return question
+
+
+def bulk_create_questions(specs):
+    """
+    Create question objects with a single INSERT.
+
+    Each spec is a `(question_text, pub_days, end_days)` tuple, with the
+    days offset to now as in `create_question`.
+    """
+    now = timezone.now()
+    questions = [
+        Question(question_text=text,
+                 pub_date=now + datetime.timedelta(days=pub_days),
+                 end_date=(now + datetime.timedelta(days=end_days)
+                           if end_days is not None else None))
+        for text, pub_days, end_days in specs
+    ]
+    return Question.objects.bulk_create(questions, batch_size=500)
+
+
+def vote_counts(question):
+    """
+    Return the number of votes of each choice in the `question`.
+
+    Choices without any vote are not included.
+    """
+    return dict(Vote.objects.filter(question_id=question.id)
+                .values_list('choice_id')
+                .annotate(n=Count('id'))
+                .order_by())
@@ -1,37 +1,20 @@
 """Unittests for authenticated user behavior."""
-import datetime
-
-from django.test import TestCase
-from django.utils import timezone
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from mysite import settings
 
 from polls.models import Question, Choice
+from polls.tests._factories import create_question, vote_counts
 
-
-def create_question(question_text, pub_days=0, end_days=None, num_choice=0):
-    """
-    Create question object.
-
-    Create a question with the given `question_text`, published the
-    given number of `pub_days`, and ended the
-    given number of `end_days` offset to now (negative for questions published
-    in the past, positive for questions that have yet to be published).
-    The question contains `num_choice` amount of choices.
-    """
-    pub_time = timezone.now() + datetime.timedelta(days=pub_days)
-    try:
-        end_time = timezone.now() + datetime.timedelta(days=end_days)
-    except TypeError:
-        end_time = None
-    question = Question.objects.create(question_text=question_text,
-                                       pub_date=pub_time, end_date=end_time)
-    for i in range(num_choice):
-        question.choice_set.create(choice_text=str(i))
-    return question
+LOGIN_URL = reverse("login")
+LOGOUT_URL = reverse("logout")
+LOGIN_REDIRECT_URL = reverse(settings.LOGIN_REDIRECT_URL)
+LOGOUT_REDIRECT_URL = reverse(settings.LOGOUT_REDIRECT_URL)
 
 
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
 class UserAuthTest(TestCase):
     """Tests of user authentication."""
 
@@ -53,9 +36,8 @@ class UserAuthTest(TestCase):
         q = Question.objects.create(question_text="First Poll Question")
         q.save()
         # a few choices
-        for n in range(1, 4):
-            choice = Choice(choice_text=f"Choice {n}", question=q)
-            choice.save()
+        Choice.objects.bulk_create([Choice(choice_text=f"Choice {n}", question=q)
+                                    for n in range(1, 4)])
         self.question = q
 
     def vote(self, question: Question, choice: Choice):
@@ -72,38 +54,46 @@ class UserAuthTest(TestCase):
         then I am logged out
         and then redirected to the login page.
         """
-        logout_url = reverse("logout")
         # Authenticate the user.
         # We want to logout this user, so we need to associate the
         # user user with a session.  Setting client.user = ... doesn't work.
-        # Use Client.login(username, password) to do that.
-        # Client.login returns true on success
-        self.assertTrue(
-            self.client.login(username=self.username, password=self.password)
-        )
+        # Use Client.force_login(user) to do that without checking
+        # the password, which is covered by test_login_view.
+        self.client.force_login(self.user1)
         # visit the logout page
         form_data = {}
-        response = self.client.post(logout_url, form_data)
+        response = self.client.post(LOGOUT_URL, form_data)
         self.assertEqual(302, response.status_code)
 
-        self.assertRedirects(response, reverse(settings.LOGOUT_REDIRECT_URL))
+        self.assertRedirects(response, LOGOUT_REDIRECT_URL)
 
     def test_login_view(self):
         """A user can login using the login view."""
-        login_url = reverse("login")
         # Can get the login page
-        response = self.client.get(login_url)
+        response = self.client.get(LOGIN_URL)
         self.assertEqual(200, response.status_code)
         # Can login using a POST request
         # usage: client.post(url, {'key1":"value", "key2":"value"})
         form_data = {"username": "testuser",
                      "password": "FatChance!"
                      }
-        response = self.client.post(login_url, form_data)
+        response = self.client.post(LOGIN_URL, form_data)
         # after successful login, should redirect browser somewhere
         self.assertEqual(302, response.status_code)
         # should redirect us to the polls index page ("polls:index")
-        self.assertRedirects(response, reverse(settings.LOGIN_REDIRECT_URL))
+        self.assertRedirects(response, LOGIN_REDIRECT_URL)
+
+    def test_login_logged_once(self):
+        """A login is logged once, with the first forwarded address."""
+        form_data = {"username": "testuser",
+                     "password": "FatChance!"
+                     }
+        with self.assertLogs("polls.signals", level="INFO") as logs:
+            self.client.post(LOGIN_URL, form_data,
+                             HTTP_X_FORWARDED_FOR="10.0.0.1, 10.0.0.2")
+        self.assertEqual(1, len(logs.records))
+        self.assertIn("via ip: 10.0.0.1", logs.output[0])
+        self.assertNotIn("10.0.0.2", logs.output[0])
 
     def test_user_get_detail_question(self):
         """
@@ -137,22 +127,89 @@ class UserAuthTest(TestCase):
 
         # Create question
         question = create_question(question_text="question", num_choice=2)
-        choice1 = question.choice_set.all()[0]
-        choice2 = question.choice_set.all()[1]
-        self.assertEqual(choice1.votes, 0)
-        self.assertEqual(choice2.votes, 0)
+        choice1, choice2 = list(question.choice_set.all())
+        self.assertEqual(vote_counts(question), {})
 
         # Vote Choice1
         self.vote(question, choice1)
-        self.assertEqual(choice1.votes, 1)
-        self.assertEqual(choice2.votes, 0)
+        self.assertEqual(vote_counts(question), {choice1.id: 1})
 
         # Vote Choice1 again
         self.vote(question, choice1)
-        self.assertEqual(choice1.votes, 1)
-        self.assertEqual(choice2.votes, 0)
+        self.assertEqual(vote_counts(question), {choice1.id: 1})
 
         # Vote Choice2
         self.vote(question, choice2)
-        self.assertEqual(choice1.votes, 0)
-        self.assertEqual(choice2.votes, 1)
+        self.assertEqual(vote_counts(question), {choice2.id: 1})
+
+    def test_new_vote_queries(self):
+        """
+        A first vote is saved with one UPDATE and one INSERT.
+
+        The other queries load the session, the user, the question and
+        the choice. The INSERT runs in a savepoint, which adds two more.
+        """
+        self.client.force_login(self.user1)
+        choice = self.question.choice_set.first()
+        with self.assertNumQueries(8):
+            self.vote(self.question, choice)
+        self.assertEqual(vote_counts(self.question), {choice.id: 1})
+
+    def test_change_vote_queries(self):
+        """
+        A changed vote is saved with a single UPDATE.
+
+        The other queries load the session, the user, the question and
+        the choice.
+        """
+        self.client.force_login(self.user1)
+        choice1, choice2 = list(self.question.choice_set.all())[:2]
+        self.vote(self.question, choice1)
+        with self.assertNumQueries(5):
+            self.vote(self.question, choice2)
+        self.assertEqual(vote_counts(self.question), {choice2.id: 1})
+
+    def test_index_shows_current_vote(self):
+        """The index page shows the choice the user voted for each poll."""
+        self.client.force_login(self.user1)
+        voted = create_question(question_text="voted", num_choice=2)
+        not_voted = create_question(question_text="not voted", num_choice=2)
+        choice = voted.choice_set.first()
+        self.vote(voted, choice)
+        response = self.client.get(reverse("polls:index"))
+        questions = {q.id: q for q in response.context["latest_question_list"]}
+        self.assertTrue(questions[voted.id].user_voted)
+        self.assertEqual(questions[voted.id].user_choice, choice.choice_text)
+        self.assertFalse(questions[not_voted.id].user_voted)
+        self.assertContains(response, f"Your current vote: {choice.choice_text}")
+
+    def test_detail_shows_current_choice(self):
+        """The detail page checks and names the choice the user voted for."""
+        self.client.force_login(self.user1)
+        choice = self.question.choice_set.last()
+        self.vote(self.question, choice)
+        url = reverse("polls:detail", args=(self.question.id,))
+        response = self.client.get(url)
+        self.assertEqual(response.context["cur_choice_id"], choice.id)
+        self.assertIn(f"Your current choice is '{choice.choice_text}'",
+                      [str(m) for m in response.context["messages"]])
+
+    def test_vote_without_choice(self):
+        """Voting without selecting a choice redirects back to the poll."""
+        self.client.force_login(self.user1)
+        vote_url = reverse("polls:vote", args=(self.question.id,))
+        response = self.client.post(vote_url, {})
+        self.assertRedirects(
+            response, reverse("polls:detail", args=(self.question.id,)),
+            fetch_redirect_response=False)
+        self.assertEqual(vote_counts(self.question), {})
+
+    def test_vote_with_invalid_choice(self):
+        """Voting with a choice which isn't an id redirects back to the poll."""
+        self.client.force_login(self.user1)
+        vote_url = reverse("polls:vote", args=(self.question.id,))
+        response = self.client.post(vote_url, {"choice": "abc"})
+        self.assertRedirects(
+            response, reverse("polls:detail", args=(self.question.id,)),
+            fetch_redirect_response=False)
+        self.assertEqual(vote_counts(self.question), {})
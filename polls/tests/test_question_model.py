@@ -1,13 +1,13 @@
 """Unittests for question model."""
 import datetime
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 
 from polls.models import Question
 
 
-class QuestionModelTests(TestCase):
+class QuestionModelTests(SimpleTestCase):
     """Tests of question model."""
 
     def test_was_published_recently_with_future_question(self):
@@ -17,9 +17,9 @@ class QuestionModelTests(TestCase):
         was_published_recently() returns False for questions whose pub_date
         is in the future.
         """
-        time = timezone.now() + datetime.timedelta(days=30)
-        future_question = Question(pub_date=time)
-        self.assertIs(future_question.was_published_recently(), False)
+        now = timezone.now()
+        future_question = Question(pub_date=now + datetime.timedelta(days=30))
+        self.assertIs(future_question.was_published_recently(now), False)
 
     def test_was_published_recently_with_old_question(self):
         """
@@ -28,9 +28,10 @@ class QuestionModelTests(TestCase):
         was_published_recently() returns False for questions whose pub_date
         is older than 1 day.
         """
-        time = timezone.now() - datetime.timedelta(days=1, seconds=1)
-        old_question = Question(pub_date=time)
-        self.assertIs(old_question.was_published_recently(), False)
+        now = timezone.now()
+        old_question = Question(
+            pub_date=now - datetime.timedelta(days=1, seconds=1))
+        self.assertIs(old_question.was_published_recently(now), False)
 
     def test_was_published_recently_with_recent_question(self):
         """
@@ -39,10 +40,10 @@ class QuestionModelTests(TestCase):
         was_published_recently() returns True for questions whose pub_date
         is within the last day.
         """
-        time = (timezone.now() -
-                datetime.timedelta(hours=23, minutes=59, seconds=59))
-        recent_question = Question(pub_date=time)
-        self.assertIs(recent_question.was_published_recently(), True)
+        now = timezone.now()
+        recent_question = Question(
+            pub_date=now - datetime.timedelta(hours=23, minutes=59, seconds=59))
+        self.assertIs(recent_question.was_published_recently(now), True)
 
     def test_is_published_with_future_question(self):
         """
@@ -51,9 +52,9 @@ class QuestionModelTests(TestCase):
         is_published() returns False for questions whose pub_date
         is after the current time.
         """
-        time = timezone.now() + datetime.timedelta(days=30)
-        future_question = Question(pub_date=time)
-        self.assertIs(future_question.is_published(), False)
+        now = timezone.now()
+        future_question = Question(pub_date=now + datetime.timedelta(days=30))
+        self.assertIs(future_question.is_published(now), False)
 
     def test_is_published_with_default_question(self):
         """
@@ -72,9 +73,10 @@ class QuestionModelTests(TestCase):
         is_published() returns True for questions whose pub_date
         is before the current time.
         """
-        time = timezone.now() - datetime.timedelta(days=1, seconds=1)
-        old_question = Question(pub_date=time)
-        self.assertIs(old_question.is_published(), True)
+        now = timezone.now()
+        old_question = Question(
+            pub_date=now - datetime.timedelta(days=1, seconds=1))
+        self.assertIs(old_question.is_published(now), True)
 
     def test_can_vote_with_default_end_date(self):
         """
@@ -83,23 +85,67 @@ class QuestionModelTests(TestCase):
         can_vote() returns True for questions whose pub_date
         is before the current time.
         """
-        past = timezone.now() - datetime.timedelta(days=10)
-        future = timezone.now() + datetime.timedelta(days=10)
-        old_question = Question(pub_date=past)
         now_question = Question()
-        future_question = Question(pub_date=future)
-        self.assertIs(old_question.is_published(), True)
-        self.assertIs(now_question.is_published(), True)
-        self.assertIs(future_question.is_published(), False)
+        now = now_question.pub_date
+        old_question = Question(pub_date=now - datetime.timedelta(days=10))
+        future_question = Question(pub_date=now + datetime.timedelta(days=10))
+        self.assertIs(old_question.is_published(now), True)
+        self.assertIs(now_question.is_published(now), True)
+        self.assertIs(future_question.is_published(now), False)
 
     def test_cannot_vote_after_end_date(self):
         """Cannot vote if the end_date is in the past."""
-        end_date = timezone.now() - datetime.timedelta(seconds=1)
-        pass_end_date_question = Question(end_date=end_date)
-        self.assertIs(pass_end_date_question.can_vote(), False)
+        now = timezone.now()
+        pass_end_date_question = Question(
+            pub_date=now - datetime.timedelta(days=1),
+            end_date=now - datetime.timedelta(seconds=1))
+        self.assertIs(pass_end_date_question.can_vote(now), False)
 
     def test_can_vote_before_the_end_date(self):
         """Can vote if the end_date is in the future."""
-        end_date = timezone.now() + datetime.timedelta(seconds=1)
-        before_end_date_question = Question(end_date=end_date)
-        self.assertIs(before_end_date_question.can_vote(), True)
+        now = timezone.now()
+        before_end_date_question = Question(
+            pub_date=now - datetime.timedelta(days=1),
+            end_date=now + datetime.timedelta(seconds=1))
+        self.assertIs(before_end_date_question.can_vote(now), True)
+
+    def test_can_vote_at_the_end_date(self):
+        """Can vote if the current time is exactly the end_date."""
+        now = timezone.now()
+        end_date_question = Question(
+            pub_date=now - datetime.timedelta(days=1), end_date=now)
+        self.assertIs(end_date_question.can_vote(now), True)
+
+
+class QuestionQuerySetTests(TestCase):
+    """Tests of question queryset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create questions at different stages of the voting period."""
+        now = timezone.now()
+        cls.future = Question.objects.create(
+            question_text="Future",
+            pub_date=now + datetime.timedelta(days=5))
+        cls.ended = Question.objects.create(
+            question_text="Ended",
+            pub_date=now - datetime.timedelta(days=5),
+            end_date=now - datetime.timedelta(days=1))
+        cls.open = Question.objects.create(
+            question_text="Open",
+            pub_date=now - datetime.timedelta(days=5))
+
+    def test_published(self):
+        """published() excludes questions whose pub_date is in the future."""
+        self.assertQuerySetEqual(Question.objects.published(),
+                                 [self.ended, self.open], ordered=False)
+
+    def test_votable(self):
+        """votable() excludes questions which are unpublished or ended."""
+        self.assertQuerySetEqual(Question.objects.votable(), [self.open])
+
+    def test_with_voting_status(self):
+        """with_voting_status() flags only the questions not yet ended."""
+        questions = Question.objects.published().with_voting_status()
+        self.assertEqual({q.id: q.can_vote_now for q in questions},
+                         {self.ended.id: False, self.open.id: True})
@@ -1,41 +1,27 @@
 """Unittests for KU Polls views."""
-import datetime
-
-from django.test import TestCase
-from django.utils import timezone
+from django.test import Client, RequestFactory, TestCase
 from django.urls import reverse
+from django.contrib.auth.models import AnonymousUser, User
 
-from polls.models import Question
-
+from polls.models import Vote
+from polls.views import IndexView
+from polls.tests._factories import bulk_create_questions, create_question
 
-def create_question(question_text, pub_days=0, end_days=None, num_choice=0):
-    """
-    Create question object.
-
-    Create a question with the given `question_text`, published the
-    given number of `pub_days`, and ended the
-    given number of `end_days` offset to now (negative for questions published
-    in the past, positive for questions that have yet to be published).
-    The question contains `num_choice` amount of choices.
-    """
-    pub_time = timezone.now() + datetime.timedelta(days=pub_days)
-    try:
-        end_time = timezone.now() + datetime.timedelta(days=end_days)
-    except TypeError:
-        end_time = None
-    question = Question.objects.create(question_text=question_text,
-                                       pub_date=pub_time, end_date=end_time)
-    for i in range(num_choice):
-        question.choice_set.create(choice_text=str(i))
-    return question
+INDEX_URL = reverse("polls:index")
 
 
 class QuestionIndexViewTests(TestCase):
     """Tests of index page view."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Create a client shared by the GET-only tests of this class."""
+        super().setUpClass()
+        cls.client_ro = Client()
+
     def test_no_questions(self):
         """If no questions exist, an appropriate message is displayed."""
-        response = self.client.get(reverse("polls:index"))
+        response = self.client_ro.get(INDEX_URL)
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "No polls are available.")
         self.assertQuerySetEqual(response.context["latest_question_list"], [])
@@ -44,16 +30,29 @@ class QuestionIndexViewTests(TestCase):
         """Questions with a pub_date in the past are displayed on the index page."""
         question = create_question(question_text="Past question.",
                                    pub_days=-30)
-        response = self.client.get(reverse("polls:index"))
+        response = self.client_ro.get(INDEX_URL)
         self.assertQuerySetEqual(
             response.context["latest_question_list"],
             [question],
         )
 
+    def test_request_factory(self):
+        """The index view works on a request built by RequestFactory."""
+        question = create_question(question_text="Past question.",
+                                   pub_days=-30)
+        request = RequestFactory().get(INDEX_URL)
+        request.user = AnonymousUser()
+        response = IndexView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertQuerySetEqual(
+            response.context_data["latest_question_list"],
+            [question],
+        )
+
     def test_future_question(self):
         """Questions with a pub_date in the future aren't displayed on the index page."""
         create_question(question_text="Future question.", pub_days=30)
-        response = self.client.get(reverse("polls:index"))
+        response = self.client_ro.get(INDEX_URL)
         self.assertContains(response, "No polls are available.")
         self.assertQuerySetEqual(response.context["latest_question_list"], [])
 
@@ -62,7 +61,7 @@ class QuestionIndexViewTests(TestCase):
         question = create_question(question_text="Past question.",
                                    pub_days=-30)
         create_question(question_text="Future question.", pub_days=30)
-        response = self.client.get(reverse("polls:index"))
+        response = self.client_ro.get(INDEX_URL)
         self.assertQuerySetEqual(
             response.context["latest_question_list"],
             [question],
@@ -70,11 +69,11 @@ class QuestionIndexViewTests(TestCase):
 
     def test_two_past_questions(self):
         """The questions index page may display multiple questions."""
-        question1 = create_question(question_text="Past question 1.",
-                                    pub_days=-30)
-        question2 = create_question(question_text="Past question 2.",
-                                    pub_days=-5)
-        response = self.client.get(reverse("polls:index"))
+        question1, question2 = bulk_create_questions([
+            ("Past question 1.", -30, None),
+            ("Past question 2.", -5, None),
+        ])
+        response = self.client_ro.get(INDEX_URL)
         self.assertQuerySetEqual(
             response.context["latest_question_list"],
             [question2, question1],
@@ -84,6 +83,14 @@ class QuestionIndexViewTests(TestCase):
 class QuestionDetailViewTests(TestCase):
     """Tests of detail page view."""
 
+    @classmethod
+    def setUpTestData(cls):
+        """Create the questions shared by the tests of this class."""
+        cls.future_q = create_question(question_text="Future question.",
+                                       pub_days=5)
+        cls.after_end_q = create_question(question_text="Past Question.",
+                                          pub_days=-10, end_days=-5)
+
     def test_future_question(self):
         """
         Tests detail page response for future question.
@@ -91,12 +98,10 @@ class QuestionDetailViewTests(TestCase):
         The detail view of a question with a pub_date in the future
         should redirect to polls index page.
         """
-        future_question = create_question(question_text="Future question.",
-                                          pub_days=5)
-        url = reverse("polls:detail", args=(future_question.id,))
+        url = reverse("polls:detail", args=(self.future_q.id,))
         response = self.client.get(url)
         self.assertEqual(response.status_code, 302)
-        self.assertRedirects(response, reverse("polls:index"))
+        self.assertRedirects(response, INDEX_URL)
 
     def test_after_end_date_question(self):
         """
@@ -105,12 +110,10 @@ class QuestionDetailViewTests(TestCase):
         The detail view of a question with an end_date in the past
         should redirect to polls index page.
         """
-        after_end_date = create_question(question_text="Past Question.",
-                                         pub_days=-10, end_days=-5)
-        url = reverse("polls:detail", args=(after_end_date.id,))
+        url = reverse("polls:detail", args=(self.after_end_q.id,))
         response = self.client.get(url)
         self.assertEqual(response.status_code, 302)
-        self.assertRedirects(response, reverse("polls:index"))
+        self.assertRedirects(response, INDEX_URL)
 
     def test_redirect_to_result_page_after_vote(self):
         """
@@ -119,7 +122,7 @@ class QuestionDetailViewTests(TestCase):
         The detail view should get redirect status code when user vote.
         """
         question = create_question('question', num_choice=1)
-        choice = question.choice_set.all()[0]
+        choice, = list(question.choice_set.all())
         vote_url = reverse("polls:vote", args=(question.id,))
         response = self.client.post(vote_url, {'choice': choice.id})
         self.assertEqual(response.status_code, 302)
@@ -128,6 +131,23 @@ class QuestionDetailViewTests(TestCase):
 class QuestionResultsViewTests(TestCase):
     """Tests of result page view."""
 
+    @classmethod
+    def setUpClass(cls):
+        """Create a client shared by the GET-only tests of this class."""
+        super().setUpClass()
+        cls.client_ro = Client()
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create the questions and the vote shared by the tests of this class."""
+        cls.future_q = create_question(question_text="Future question.",
+                                       pub_days=5)
+        cls.past_q = create_question(question_text="Past Question.",
+                                     pub_days=-5, num_choice=2)
+        cls.voted, cls.not_voted = cls.past_q.choice_set.order_by('id')
+        user = User.objects.create_user(username="voter")
+        Vote.objects.create(user=user, choice=cls.voted, question=cls.past_q)
+
     def test_future_question(self):
         """
         Tests result page response for future question.
@@ -135,10 +155,8 @@ class QuestionResultsViewTests(TestCase):
         The results view of a question with a pub_date in the future
         returns a 404 not found.
         """
-        future_question = create_question(question_text="Future question.",
-                                          pub_days=5)
-        url = reverse("polls:results", args=(future_question.id,))
-        response = self.client.get(url)
+        url = reverse("polls:results", args=(self.future_q.id,))
+        response = self.client_ro.get(url)
         self.assertEqual(response.status_code, 404)
 
     def test_past_question(self):
@@ -148,8 +166,14 @@ class QuestionResultsViewTests(TestCase):
         The results view of a question with a pub_date in the past
         displays the question's text.
         """
-        past_question = create_question(question_text="Past Question.",
-                                        pub_days=-5)
-        url = reverse("polls:results", args=(past_question.id,))
-        response = self.client.get(url)
-        self.assertContains(response, past_question.question_text)
+        url = reverse("polls:results", args=(self.past_q.id,))
+        response = self.client_ro.get(url)
+        self.assertContains(response, self.past_q.question_text)
+
+    def test_vote_counts(self):
+        """The results view displays the number of votes for each choice."""
+        url = reverse("polls:results", args=(self.past_q.id,))
+        response = self.client_ro.get(url)
+        counts = {choice.id: choice.vote_count
+                  for choice in response.context["question"].choices_with_counts}
+        self.assertEqual(counts, {self.voted.id: 1, self.not_voted.id: 0})
@@ -0,0 +1,30 @@
+"""Unittests for vote model."""
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from polls.models import Vote
+from polls.tests._factories import create_question
+
+
+class VoteModelTests(TestCase):
+    """Tests of vote model."""
+
+    def test_question_is_taken_from_the_choice(self):
+        """A saved vote belongs to the question of its choice."""
+        question = create_question(question_text="Question", num_choice=1)
+        other = create_question(question_text="Other")
+        user = User.objects.create_user(username="voter")
+        vote = Vote(user=user, choice=question.choice_set.get(),
+                    question=other)
+        vote.save()
+        vote.refresh_from_db()
+        self.assertEqual(vote.question_id, question.id)
+
+    def test_save_by_ids_does_not_load_the_choice(self):
+        """Saving a vote by ids with its question runs only the INSERT."""
+        question = create_question(question_text="Question", num_choice=1)
+        choice_id = question.choice_set.get().id
+        user = User.objects.create_user(username="voter")
+        with self.assertNumQueries(1):
+            Vote.objects.create(user_id=user.id, choice_id=choice_id,
+                                question_id=question.id)
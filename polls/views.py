@@ -1,14 +1,14 @@
 """KU Polls app UI."""
-from django.http import HttpResponseRedirect
+from django.db import IntegrityError, transaction
+from django.db.models import (Count, Exists, OuterRef, Prefetch, Subquery,
+                              Value)
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
-from django.views import generic
 from django.utils import timezone
+from django.views import generic
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.signals import (user_logged_in,
-                                         user_logged_out, user_login_failed)
-from django.dispatch import receiver
 
 from .models import Choice, Question, Vote
 
@@ -17,44 +17,17 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def get_client_ip(request):
-    """Get the visitor’s IP address using request headers."""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
-@receiver(user_logged_in)
-def user_logged_in_callback(sender, request, user, **kwargs):
-    """Log a message when user logging in to the app."""
-    ip = request.META.get('REMOTE_ADDR')
-
-    logger.info('login user: {user} via ip: {ip}'.format(
-        user=user,
-        ip=ip
-    ))
-
-
-@receiver(user_logged_out)
-def user_logged_out_callback(sender, request, user, **kwargs):
-    """Log a message when user logging out of the app."""
-    ip = request.META.get('REMOTE_ADDR')
-
-    logger.info('logout user: {user} via ip: {ip}'.format(
-        user=user,
-        ip=ip
-    ))
-
+def get_request_time(request):
+    """
+    Return the time of the request.
 
-@receiver(user_login_failed)
-def user_login_failed_callback(sender, credentials, **kwargs):
-    """Log a message when user fail to logging in to the app."""
-    logger.warning('login failed for: {credentials}'.format(
-        credentials=credentials,
-    ))
+    The time is read once and kept on the request as ``request.now``,
+    so every check made while handling the request uses the same time.
+    """
+    now = getattr(request, 'now', None)
+    if now is None:
+        now = request.now = timezone.now()
+    return now
 
 
 class IndexView(generic.ListView):
@@ -64,17 +37,26 @@ class IndexView(generic.ListView):
     context_object_name = "latest_question_list"
 
     def get_queryset(self):
-        """Return the published questions."""
-        return Question.objects.filter(pub_date__lte=timezone.now()).order_by("-pub_date")
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+        """
+        Return the published questions with their total votes.
+
+        Each question is also annotated with whether voting is still
+        open, whether the current user has voted for it and the text
+        of the user's choice.
+        """
+        now = get_request_time(self.request)
+        questions = (Question.objects.published(now)
+                     .with_voting_status(now)
+                     .annotate(total_votes=Count('choice__vote'))
+                     .order_by("-pub_date"))
         cur_user = self.request.user
-        latest_question_list = context["latest_question_list"]
-        for question in latest_question_list:
-            question.user_voted = question.cur_user_voted(cur_user)
-            question.user_choice = question.cur_user_choice(cur_user)
-        return context
+        if not cur_user.is_authenticated:
+            return questions.annotate(user_voted=Value(False))
+        user_votes = Vote.objects.filter(user_id=cur_user.id,
+                                         question_id=OuterRef('pk'))
+        return questions.annotate(
+            user_voted=Exists(user_votes),
+            user_choice=Subquery(user_votes.values('choice__choice_text')[:1]))
 
 
 class DetailView(generic.DetailView):
@@ -84,47 +66,49 @@ class DetailView(generic.DetailView):
     template_name = "polls/detail.html"
 
     def get_queryset(self):
-        """Excludes any questions that aren't published yet."""
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        """
+        Excludes any questions that aren't published yet.
+
+        Each question is also annotated with whether voting is still
+        open, and with the id and the text of the current user's choice,
+        which are None if the user hasn't voted.
+        """
+        now = get_request_time(self.request)
+        user_votes = Vote.objects.filter(user_id=self.request.user.id,
+                                         question_id=OuterRef('pk'))
+        return (Question.objects.published(now)
+                .with_voting_status(now)
+                .annotate(
+                    user_choice_id=Subquery(
+                        user_votes.values('choice_id')[:1]),
+                    user_choice_text=Subquery(
+                        user_votes.values('choice__choice_text')[:1])))
 
     def get_context_data(self, **kwargs):
         """Get user current vote choice into the context."""
         context = super().get_context_data(**kwargs)
-        question = self.get_object()
-        cur_user = self.request.user
-        try:
-            cur_vote = Vote.objects.get(user=cur_user,
-                                        choice__question=question)
-        except Vote.DoesNotExist:
-            context['cur_choice'] = None
-        else:
-            context['cur_choice'] = cur_vote.choice
+        context['cur_choice_id'] = self.object.user_choice_id
         return context
 
     def get(self, request, *args, **kwargs):
         """Render the poll detail page."""
-        if self.request.user.is_authenticated:
-            try:
-                question = Question.objects.get(pk=self.kwargs['pk'])
-            except Question.DoesNotExist:
-                messages.error(request, 'The poll does not exist.')
-                return redirect('polls:index')
-            if question.can_vote():
-                try:
-                    current_user = request.user
-                    vote = Vote.objects.get(user=current_user,
-                                            choice__question=question)
-                except Vote.DoesNotExist:
-                    pass
-                else:
-                    messages.info(request=request,
-                                  message=f"Your current choice is '{vote.choice}'")
-                finally:
-                    return super().get(request, *args, **kwargs)
-            messages.error(request, 'Voting is not available for the poll.')
-        else:
+        if not request.user.is_authenticated:
             messages.error(request, 'Please log in first!')
-        return redirect('polls:index')
+            return redirect('polls:index')
+        try:
+            self.object = self.get_object()
+        except Http404:
+            messages.error(request, 'The poll does not exist.')
+            return redirect('polls:index')
+        if not self.object.can_vote_now:
+            messages.error(request, 'Voting is not available for the poll.')
+            return redirect('polls:index')
+        if self.object.user_choice_id is not None:
+            messages.info(request=request,
+                          message=f"Your current choice is "
+                                  f"'{self.object.user_choice_text}'")
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
 
 
 class ResultsView(generic.DetailView):
@@ -134,8 +118,20 @@ class ResultsView(generic.DetailView):
     template_name = "polls/results.html"
 
     def get_queryset(self):
-        """Excludes any questions that aren't published yet."""
-        return Question.objects.filter(pub_date__lte=timezone.now())
+        """
+        Excludes any questions that aren't published yet.
+
+        The choices are prefetched with their vote counts, in the order
+        they were created.
+        """
+        choices = Choice.objects.annotate(
+            vote_count=Count('vote')).order_by('id')
+        now = get_request_time(self.request)
+        return Question.objects.published(now).only(
+            'id', 'question_text'
+        ).prefetch_related(
+            Prefetch('choice_set', queryset=choices,
+                     to_attr='choices_with_counts'))
 
 
 @login_required
@@ -149,32 +145,41 @@ def vote(request, question_id):
     question = get_object_or_404(Question, pk=question_id)
 
     try:
-        selected_choice = question.choice_set.get(pk=request.POST["choice"])
-    except (KeyError, Choice.DoesNotExist):
+        selected = (Choice.objects
+                    .filter(pk=request.POST.get("choice"),
+                            question_id=question.id)
+                    .values_list('id', 'choice_text')
+                    .first())
+    except ValueError:
+        # the submitted choice isn't a valid id
+        selected = None
+    if selected is None:
         # Redisplay the question voting form.
         messages.error(request=request, message="You didn't select a choice.")
         return redirect("polls:detail", pk=question_id)
+    selected_choice_id, selected_choice_text = selected
 
     current_user = request.user
 
-    try:
-        vote = Vote.objects.get(user=current_user, choice__question=question)
-        # user have vote for this question
-        vote.choice = selected_choice
-        vote.save()
-        messages.success(request=request,
-                         message=f"Your vote are now '{selected_choice.choice_text}'")
-    except Vote.DoesNotExist:
-        vote = Vote.objects.create(user=current_user, choice=selected_choice)
-        messages.success(request=request,
-                         message=f"Your vote are now '{selected_choice.choice_text}'")
+    # change the vote if user have vote for this question
+    user_vote = Vote.objects.filter(user_id=current_user.id,
+                                    question_id=question.id)
+    if not user_vote.update(choice_id=selected_choice_id):
+        try:
+            with transaction.atomic():
+                Vote.objects.create(user=current_user, question=question,
+                                    choice_id=selected_choice_id)
+        except IntegrityError:
+            # a concurrent request has saved the user's first vote
+            user_vote.update(choice_id=selected_choice_id)
+    messages.success(request=request,
+                     message=f"Your vote are now '{selected_choice_text}'")
 
     # Always return an HttpResponseRedirect after successfully dealing
     # with POST data. This prevents data from being posted twice if a
     # user hits the Back button.
-    logger.info(f'user:{current_user.username} '
-                f'vote for choice:{selected_choice.id} '
-                f'in question:{selected_choice.question.id}')
+    logger.info('user:%s vote for choice:%s in question:%s',
+                current_user.get_username(), selected_choice_id, question.id)
     return HttpResponseRedirect(reverse("polls:results",
                                         args=(question.id,)))
 
@@ -184,18 +189,19 @@ def clear(request, question_id):
     question = get_object_or_404(Question, pk=question_id)
     current_user = request.user
 
-    try:
-        vote = Vote.objects.get(user=current_user, choice__question=question)
+    user_vote = Vote.objects.filter(user_id=current_user.id,
+                                    question_id=question.id)
+    choice_id = user_vote.values_list('choice_id', flat=True).first()
+    if choice_id is None:
+        messages.error(request=request, message="You haven't vote.")
+    else:
         # user have vote for this question
-        vote.delete()
+        user_vote.delete()
         messages.success(request=request,
-                         message=f"Your vote has been cleared.")
+                         message="Your vote has been cleared.")
 
-        logger.info(f'user:{current_user.username} '
-                    f'clear vote for choice:{vote.choice.id} '
-                    f'in question:{question.id}')
-    except Vote.DoesNotExist:
-        messages.error(request=request, message=f"You haven't vote.")
+        logger.info('user:%s clear vote for choice:%s in question:%s',
+                    current_user.get_username(), choice_id, question.id)
 
     return HttpResponseRedirect(reverse("polls:detail",
                                         args=(question.id,)))